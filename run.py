@@ -1,68 +1,264 @@
-from mininet.node import Switch
+from mininet.node import Controller, Switch
 from mininet.topo import Topo
 from mininet.net import Mininet
 from mininet.cli import CLI
+from mininet.util import ipAdd, macColonHex
+from concurrent.futures import ThreadPoolExecutor
+import functools
+import os
+import signal
+import subprocess
 import sys
 import time
-import json
+
+try:
+    # orjson parses several times faster than stdlib json and takes
+    # bytes directly. Fall back silently when it isn't installed.
+    from orjson import loads as _json_loads
+except ImportError:
+    from json import loads as _json_loads
 
 
 RELEASE_EXECUTABLE = "./target/release/stp-rs"
 
+# Where switch logs land. Overridable so concurrent runs (tests.py corr
+# mode) don't clobber each other's logs; the stp-rs supervisor reads
+# the same variable.
+LOG_DIR = os.environ.get("STP_LOG_DIR", "logs")
+
+# Line stp-rs logs once it leaves learning mode and begins forwarding.
+STP_READY_MARKER = "startup complete"
+
+
+# Upper bound on threads used for parallel switch operations. Large
+# topologies like ftree16 shouldn't spawn one thread per switch.
+MAX_POOL_WORKERS = 32
+
 
 class EtherSwitch(Switch):
-    ''' A custom extension of the base mininet switch that
-    runs the executable for each mininet switch. '''
+    ''' A custom extension of the base mininet switch. The switch logic
+    itself lives in the stp-rs supervisor process that EtherNet starts
+    for the whole network, so there's nothing to launch per switch. '''
 
     def __init__(self, name: str, **kwargs):
         self.name = name
         super(EtherSwitch, self).__init__(name, **kwargs)
 
     def start(self, controllers):
-        self.cmd(
-            f'mkdir -p logs && {RELEASE_EXECUTABLE} {self.name} > "logs/{self.name}-log.txt" &')
+        pass
+
+    def stop(self):
+        pass
+
+
+class EtherNet(Mininet):
+    ''' A mininet that builds its nodes in parallel and runs all of its
+    switches inside a single stp-rs supervisor process. Mininet keeps
+    switches in the root network namespace, so one process can watch
+    every switch's interfaces instead of forking a shell and an
+    executable per switch. '''
+
+    def __init__(self, *args, **kwargs):
+        self._supervisor = None
+        super(EtherNet, self).__init__(*args, **kwargs)
+
+    def buildFromTopo(self, topo=None):
+        ''' Mirrors Mininet.buildFromTopo, but constructs hosts and
+        switches concurrently. Creating a node is dominated by forking
+        its shell, so that part is farmed out to a thread pool. Nodes
+        are registered serially in submission order afterwards, keeping
+        names and IP assignment deterministic. '''
+        cls = self.controller
+        if not self.controllers and cls:
+            classes = cls if isinstance(cls, list) else [cls]
+            for i, c in enumerate(classes):
+                if isinstance(c, Controller):
+                    self.addController(c)
+                else:
+                    self.addController(f'c{i}', c)
+
+        # Reserve names, IPs, and classes up front so the pool only has
+        # to run the expensive constructors.
+        specs = []
+        for name in topo.hosts():
+            params = {'ip': ipAdd(self.nextIP, ipBaseNum=self.ipBaseNum,
+                                  prefixLen=self.prefixLen)
+                      + f'/{self.prefixLen}'}
+            if self.autoSetMacs:
+                params['mac'] = macColonHex(self.nextIP)
+            self.nextIP += 1
+            params.update(topo.nodeInfo(name))
+            specs.append((name, params.pop('cls', self.host),
+                          self.hosts, params))
+        for name in topo.switches():
+            params = {'listenPort': self.listenPort,
+                      'inNamespace': self.inNamespace}
+            params.update(topo.nodeInfo(name))
+            if not self.inNamespace and self.listenPort:
+                self.listenPort += 1
+            specs.append((name, params.pop('cls', self.switch),
+                          self.switches, params))
+
+        with ThreadPoolExecutor(
+                max_workers=min(MAX_POOL_WORKERS, len(specs))) as pool:
+            futures = [(pool.submit(node_cls, name, **params), name, registry)
+                       for (name, node_cls, registry, params) in specs]
+            for fut, name, registry in futures:
+                node = fut.result()
+                registry.append(node)
+                self.nameToNode[name] = node
+
+        for _src, _dst, params in topo.links(sort=True, withInfo=True):
+            self.addLink(**params)
+
+    def start(self):
+        if not self.built:
+            self.build()
+        for controller in self.controllers:
+            controller.start()
+        names = ",".join(switch.name for switch in self.switches)
+        print(f"starting stp-rs supervisor for {len(self.switches)} switches")
+        # Clear stale logs so wait_for_stp can't match a previous run's
+        # readiness marker before the supervisor recreates the files.
+        for switch in self.switches:
+            try:
+                os.remove(f"{LOG_DIR}/{switch.name}-log.txt")
+            except FileNotFoundError:
+                pass
+        with open(f"{LOG_DIR}/supervisor-log.txt", "w") as log:
+            self._supervisor = subprocess.Popen(
+                [RELEASE_EXECUTABLE, "--supervise", names],
+                stdout=log, stderr=subprocess.STDOUT,
+                preexec_fn=self._supervisor_preexec)
+
+    @staticmethod
+    def _supervisor_preexec():
+        # setsid gives the supervisor its own group so stop() can
+        # signal it and its switch threads in one shot.
+        os.setsid()
+        # Favor the control plane over the ping load it's validated
+        # with. Requires root, which mininet needs anyway.
+        try:
+            os.nice(-5)
+        except PermissionError:
+            pass
 
     def stop(self):
-        self.cmd(f'kill {RELEASE_EXECUTABLE}')
+        if self._supervisor is not None:
+            try:
+                os.killpg(os.getpgid(self._supervisor.pid), signal.SIGTERM)
+                self._supervisor.wait(timeout=0.5)
+            except (ProcessLookupError, subprocess.TimeoutExpired):
+                self._supervisor.kill()
+                self._supervisor.wait()
+            self._supervisor = None
+        super(EtherNet, self).stop()
+
+
+@functools.lru_cache(maxsize=None)
+def _load_topo(topo_file: str) -> dict:
+    ''' Parses a topology JSON file. Results are cached so repeated runs
+    over the same file (ex. tests.py) skip the disk read and parse.
+    The file is read as bytes; the topo files are ASCII, and both json
+    backends consume bytes directly without a decode pass. '''
+    with open(topo_file, 'rb') as f:
+        return _json_loads(f.read())
 
 
 class EtherTopo(Topo):
     def __init__(self, topo_file: str, **kwargs):
-        with open(topo_file, 'r') as topo_file:
-            self.topo = json.loads(topo_file.read())
+        # Parse before super().__init__, which calls build().
+        self.topo = _load_topo(topo_file)
         super(EtherTopo, self).__init__(**kwargs)
 
     def build(self):
-        hosts = list(self.topo["topology"]["hosts"].keys())
-        hosts.sort()
+        hosts = sorted(self.topo["topology"]["hosts"])
+        switches = self.topo["topology"]["switches"]
+        links = self.topo["topology"]["links"]
 
-        for host in hosts:
-            print(f"adding host: {host}")
-            self.addHost(host)
+        # 02:... is a locally administered MAC. Two hex digits caps the
+        # scheme at 255 hosts; formatting with :02x (not a decimal
+        # digit) keeps the addresses valid past host 9.
+        assert len(hosts) < 256, "host MAC scheme supports at most 255 hosts"
+        macs = [f"02:00:00:00:00:{ind + 1:02x}" for ind in range(len(hosts))]
 
-        for switch in self.topo["topology"]["switches"]:
-            print(f"adding switch: {switch}")
+        for host, mac in zip(hosts, macs):
+            self.addHost(host, mac=mac)
+
+        for switch in switches:
             self.addSwitch(switch, cls=EtherSwitch)
 
-        for link in self.topo["topology"]["links"]:
-            print(f"adding link: {link}")
+        for link in links:
             self.addLink(link[0], link[1])
 
+        print(f"added {len(hosts)} hosts, {len(switches)} switches, "
+              f"{len(links)} links")
+
+
+def wait_for_stp(net, timeout: float = 5):
+    ''' Waits until every switch log contains the readiness marker
+    stp-rs prints when it starts forwarding. Polling readiness instead
+    of sleeping for the worst case lets fast networks proceed
+    immediately while still giving slow ones the full timeout. '''
+    deadline = time.time() + timeout
+    pending = {switch.name for switch in net.switches}
+    while pending and time.time() < deadline:
+        for name in list(pending):
+            try:
+                with open(f"{LOG_DIR}/{name}-log.txt", 'r') as log:
+                    if STP_READY_MARKER in log.read():
+                        pending.discard(name)
+            except FileNotFoundError:
+                pass
+        if pending:
+            time.sleep(0.1)
+    if pending:
+        print(f"wait_for_stp timed out waiting on: {sorted(pending)}")
+
+
+def parallel_ping_all(net, label: str = "") -> float:
+    ''' Pings every host pair at once instead of mininet's serial
+    pingAll. Each ping is a separate process in its own namespace and
+    is bound by RTT and timeout rather than CPU, so total wall time is
+    roughly the slowest ping instead of the sum of all of them.
+    The label tags output lines so concurrent runs stay attributable.
+    Returns the percentage of pings dropped. '''
+    prefix = f"{label}: " if label else ""
+    pings = []
+    for src in net.hosts:
+        for dst in net.hosts:
+            if src is dst:
+                continue
+            pings.append((src, dst,
+                          src.popen(["ping", "-c1", "-W1", dst.IP()])))
+    dropped = [(src, dst) for src, dst, proc in pings if proc.wait() != 0]
+    for src, dst in dropped:
+        print(f"{prefix}ping failed: {src.name} -> {dst.name}")
+    loss = 100.0 * len(dropped) / len(pings) if pings else 0.0
+    print(f"{prefix}parallel ping: {len(pings) - len(dropped)}/{len(pings)} "
+          f"received ({loss:.1f}% dropped)")
+    return loss
+
 
-def run(interactive: bool, topo_file: str):
+def run(interactive: bool, topo_file: str) -> float:
+    ''' Builds and starts the network. Quiet runs validate it with a
+    ping sweep and return the percentage of pings dropped; interactive
+    runs report no loss. '''
+    os.makedirs(LOG_DIR, exist_ok=True)
     topo = EtherTopo(topo_file)
-    net = Mininet(topo=topo)
+    net = EtherNet(topo=topo)
     net.start()
 
+    loss = 0.0
     if interactive:
         CLI(net)
     else:
-        sleep_sec = 4
-        print(f"sleeping for {sleep_sec} sec, let STP set up")
-        time.sleep(sleep_sec)
-        net.pingAll()
+        print("waiting for STP to set up")
+        wait_for_stp(net)
+        loss = parallel_ping_all(net, label=topo_file)
 
     net.stop()
+    return loss
 
 
 def usage():
@@ -85,7 +281,10 @@ def main():
         usage()
         return
 
-    run(interactive, args[2])
+    # A lossy quiet run exits nonzero so callers like tests.py can
+    # fail on a broken spanning tree.
+    if run(interactive, args[2]) > 0:
+        sys.exit(1)
 
 
 if __name__ == "__main__":
@@ -1,4 +1,9 @@
 use anyhow::bail;
+use std::collections::hash_map::DefaultHasher;
+use std::fs::File;
+use std::hash::{Hash, Hasher};
+use std::mem;
+use std::thread;
 use std::time::Duration;
 use stp_rs::stp::eth::EthSwitch;
 
@@ -15,9 +20,71 @@ const SWITCH_TICK_SPEED: Option<Duration> = Some(Duration::from_micros(1000));
 const STARTUP_DURATION: Duration = Duration::from_millis(1000);
 
 fn main() -> anyhow::Result<()> {
-    let Some(switch_name) = std::env::args().nth(1) else {
-        bail!("First argument must be the switch name");
+    let mut args = std::env::args().skip(1);
+    let Some(first) = args.next() else {
+        bail!("First argument must be a switch name or --supervise");
     };
-    let switch = EthSwitch::build(&switch_name, BPDU_RESEND_FREQ, SWITCH_TICK_SPEED)?;
+
+    if first == "--supervise" {
+        let Some(names) = args.next() else {
+            bail!("--supervise takes a comma-separated list of switch names");
+        };
+        return supervise(&names);
+    }
+
+    let switch = EthSwitch::build(&first, BPDU_RESEND_FREQ, SWITCH_TICK_SPEED)?;
     switch.run(STARTUP_DURATION)
 }
+
+/// Runs every named switch on its own thread within this process.
+/// Mininet keeps switches in the root network namespace and each
+/// switch only watches interfaces carrying its own name, so a single
+/// process can serve the whole topology instead of mininet forking a
+/// shell and an executable per switch. Each thread writes its own
+/// `logs/<name>-log.txt` to match the standalone layout.
+fn supervise(names: &str) -> anyhow::Result<()> {
+    // run.py exports the same variable so concurrent test runs can
+    // keep their logs in separate directories.
+    let log_dir = std::env::var("STP_LOG_DIR").unwrap_or_else(|_| "logs".to_string());
+    let mut handles = Vec::new();
+    for name in names.split(',').filter(|name| !name.is_empty()) {
+        let name = name.to_string();
+        let log_dir = log_dir.clone();
+        handles.push(thread::spawn(move || -> anyhow::Result<()> {
+            pin_to_core(&name);
+            let log = File::create(format!("{log_dir}/{name}-log.txt"))?;
+            let mut switch = EthSwitch::build(&name, BPDU_RESEND_FREQ, SWITCH_TICK_SPEED)?;
+            switch.set_log(Box::new(log));
+            switch.run(STARTUP_DURATION)
+        }));
+    }
+
+    for handle in handles {
+        match handle.join() {
+            Ok(result) => result?,
+            Err(_) => bail!("A switch thread panicked"),
+        };
+    }
+    Ok(())
+}
+
+/// Pins the calling thread to a core chosen by hashing the switch
+/// name. A sticky core keeps the switch's forwarding and BPDU state
+/// hot in cache and keeps the scheduler from migrating busy-polling
+/// threads, which makes convergence timing more deterministic.
+/// Failure just leaves the thread floating, so errors are ignored.
+fn pin_to_core(switch_name: &str) {
+    let cores = unsafe { libc::sysconf(libc::_SC_NPROCESSORS_ONLN) };
+    if cores <= 0 {
+        return;
+    }
+    let mut hasher = DefaultHasher::new();
+    switch_name.hash(&mut hasher);
+    let core = (hasher.finish() % cores as u64) as usize;
+    unsafe {
+        let mut cpu_set: libc::cpu_set_t = mem::zeroed();
+        libc::CPU_SET(core, &mut cpu_set);
+        // Pid 0 targets the calling thread.
+        libc::sched_setaffinity(0, mem::size_of::<libc::cpu_set_t>(), &cpu_set);
+    }
+}
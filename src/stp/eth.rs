@@ -10,7 +10,7 @@ use pnet::{
 use std::{
     cmp::Ordering,
     collections::HashMap,
-    io::ErrorKind,
+    io::{self, ErrorKind, Write},
     mem,
     time::{Duration, Instant},
 };
@@ -89,6 +89,9 @@ pub struct EthSwitch {
     /// MacAddr is the destination mac, and the value usize is an
     /// index into the egress table.
     fwd_table: HashMap<MacAddr, usize>,
+    /// Where status lines are written. Defaults to stdout; the
+    /// supervisor gives each switch thread its own log file.
+    log: Box<dyn Write + Send>,
 }
 
 impl EthSwitch {
@@ -136,9 +139,16 @@ impl EthSwitch {
                 .checked_sub(bpdu_resend_timeout)
                 .unwrap_or_else(|| Instant::now()),
             fwd_table: HashMap::new(),
+            log: Box::new(io::stdout()),
         })
     }
 
+    /// Redirects this switch's status lines away from stdout. Used by
+    /// the supervisor so switches sharing a process keep separate logs.
+    pub fn set_log(&mut self, log: Box<dyn Write + Send>) {
+        self.log = log;
+    }
+
     /// Runs packet control and forwarding as long as the network is live.
     /// Startup duration is the amount of time switches spend learning the
     /// topology and negotiating the spanning tree before beginning to route
@@ -162,6 +172,10 @@ impl EthSwitch {
                     }
                 }
                 init_phase = false;
+                // Marks readiness for anything tailing the log, like
+                // run.py's wait_for_stp.
+                let _ = writeln!(self.log, "startup complete: forwarding host packets")
+                    .and_then(|_| self.log.flush());
             }
 
             if self.bpdu_resend_timeout < self.last_resent_bpdu.elapsed() {